@@ -1,6 +1,15 @@
 import json
+import logging
+import re
 from typing import Tuple
 
+logger = logging.getLogger(__name__)
+
+# Marker lines of the "DURATION: n / BLUEPRINT: / [json]" format, matched like
+# line.strip().upper() would: surrounding whitespace allowed, never crossing a newline
+_DURATION_RE = re.compile(r'^[^\S\n]*DURATION:[^\S\n]*(.*?)[^\S\n]*$', re.IGNORECASE | re.MULTILINE)
+_BLUEPRINT_MARKER_RE = re.compile(r'^[^\S\n]*BLUEPRINT:[^\S\n]*$', re.IGNORECASE | re.MULTILINE)
+
 
 def parse_structured_blueprint_response(response_text: str) -> Tuple[float, str]:
     """
@@ -8,31 +17,34 @@ def parse_structured_blueprint_response(response_text: str) -> Tuple[float, str]
     Returns (calculated_duration, blueprint_json)
     """
     try:
-        print(f"Parsing structured blueprint response. JSON: {response_text[:200]}...")
+        logger.debug("Parsing structured blueprint response. JSON: %s...", response_text[:200])
         
         # Validate and parse JSON
         blueprint_data = json.loads(response_text)
         
         # Calculate duration from blueprint structure
-        max_end_time = 0.0
-        for track in blueprint_data:
-            if 'clips' in track:
-                for clip in track['clips']:
-                    end_time = clip.get('endTimeInSeconds', 0)
-                    max_end_time = max(max_end_time, end_time)
+        max_end_time = max(
+            (
+                clip.get('endTimeInSeconds', 0)
+                for track in blueprint_data
+                if 'clips' in track
+                for clip in track['clips']
+            ),
+            default=0.0
+        )
         
         duration = max_end_time if max_end_time > 0 else 5.0
         
-        print(f"✅ Calculated duration from blueprint: {duration}s")
-        print(f"✅ Valid structured blueprint with {len(blueprint_data)} tracks")
+        logger.debug("✅ Calculated duration from blueprint: %ss", duration)
+        logger.debug("✅ Valid structured blueprint with %d tracks", len(blueprint_data))
         
         return duration, response_text
         
     except json.JSONDecodeError as e:
-        print(f"❌ JSON parsing error: {e}")
+        logger.error("❌ JSON parsing error: %s", e)
         return 5.0, "[]"
     except Exception as e:
-        print(f"❌ Error parsing structured response: {e}")
+        logger.error("❌ Error parsing structured response: %s", e)
         return 5.0, "[]"
 
 
@@ -47,54 +59,43 @@ def parse_blueprint_response(response_text: str) -> Tuple[float, str]:
     Returns (duration, blueprint_json)
     """
     try:
-        print(f"Parsing blueprint response. Full response:\n{response_text}")
+        logger.debug("Parsing blueprint response. Full response:\n%s", response_text)
         
-        lines = response_text.strip().split('\n')
+        text = response_text.strip()
         duration = None
         blueprint_json = ""
-        
-        # Look for DURATION line
-        duration_found = False
         blueprint_started = False
         
-        for i, line in enumerate(lines):
-            line_stripped = line.strip()
-            
-            print(f"Processing line {i}: '{line_stripped}'")
-            
-            # Parse duration
-            if line_stripped.upper().startswith('DURATION:') and not duration_found:
-                try:
-                    duration_str = line_stripped[9:].strip()
-                    print(f"Attempting to parse duration from: '{duration_str}'")
-                    duration = float(duration_str)
-                    duration_found = True
-                    print(f"✅ Successfully extracted duration: {duration} seconds")
-                except ValueError as e:
-                    print(f"❌ Failed to parse duration from: '{line_stripped}', error: {e}")
-                continue
-            
-            # Start collecting blueprint JSON after BLUEPRINT: line
-            if line_stripped.upper() == 'BLUEPRINT:' and not blueprint_started:
-                print(f"Found BLUEPRINT: marker at line {i}")
-                blueprint_started = True
-                # Collect all remaining lines as JSON
-                json_lines = lines[i+1:]
-                blueprint_json = '\n'.join(json_lines)
-                print(f"Extracted {len(json_lines)} lines of JSON")
+        # Everything after the first BLUEPRINT: line is the JSON; DURATION must precede it
+        marker = _BLUEPRINT_MARKER_RE.search(text)
+        if marker is not None:
+            logger.debug("Found BLUEPRINT: marker at offset %d", marker.start())
+            blueprint_started = True
+            blueprint_json = text[marker.end() + 1:]
+            header = text[:marker.start()]
+        else:
+            header = text
+        
+        # First DURATION: line whose value parses wins
+        for match in _DURATION_RE.finditer(header):
+            try:
+                duration = float(match.group(1))
+                logger.debug("Successfully extracted duration: %s seconds", duration)
                 break
+            except ValueError as e:
+                logger.debug("Failed to parse duration from: '%s', error: %s", match.group(0).strip(), e)
         
         # Fallback: if no structured format found, treat entire response as JSON
         if not blueprint_started:
-            print("⚠️ No structured format found, treating entire response as blueprint JSON")
-            blueprint_json = response_text.strip()
+            logger.warning("⚠️ No structured format found, treating entire response as blueprint JSON")
+            blueprint_json = text
             
         # If no duration found, estimate from blueprint
         if duration is None:
-            print("⚠️ No duration found, using default of 10 seconds")
+            logger.warning("⚠️ No duration found, using default of 10 seconds")
             duration = 10.0
         else:
-            print(f"🎯 Using AI-determined duration: {duration} seconds")
+            logger.debug("🎯 Using AI-determined duration: %s seconds", duration)
             
         # Ensure we have some JSON
         if not blueprint_json.strip():
@@ -103,18 +104,19 @@ def parse_blueprint_response(response_text: str) -> Tuple[float, str]:
         # Try to parse JSON to validate it's valid
         try:
             parsed = json.loads(blueprint_json)
-            print(f"✅ Valid JSON blueprint with {len(parsed)} tracks")
+            logger.debug("✅ Valid JSON blueprint with %d tracks", len(parsed))
         except json.JSONDecodeError as e:
-            print(f"⚠️ Blueprint JSON validation failed: {e}")
+            logger.warning("⚠️ Blueprint JSON validation failed: %s", e)
             # Don't fail here - let frontend handle validation
             
-        print(f"✅ Final parsed result - Duration: {duration}s, Blueprint length: {len(blueprint_json)} chars")
+        logger.debug("✅ Final parsed result - Duration: %ss, Blueprint length: %d chars", duration, len(blueprint_json))
         return duration, blueprint_json
         
     except Exception as e:
-        print(f"❌ Error parsing blueprint response: {e}")
+        logger.error("❌ Error parsing blueprint response: %s", e)
         # Return fallback values
         fallback_duration = 10.0
         fallback_blueprint = '[]'  # Empty blueprint
-        print(f"📊 Using fallback - Duration: {fallback_duration}s, Empty blueprint")
+        logger.warning("📊 Using fallback - Duration: %ss, Empty blueprint", fallback_duration)
         return fallback_duration, fallback_blueprint
+
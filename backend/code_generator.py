@@ -1,9 +1,19 @@
 import os
 import json
+import asyncio
+import functools
+import hashlib
+import logging
+import random
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Tuple, List, Dict, Any, Optional
 
-from providers import create_ai_provider
+import anthropic
+import httpx
+
+from providers import AIProvider, create_ai_provider, env_flag, PROVIDER_TYPES
 from prompts import build_blueprint_prompt
 from blueprint_parser import parse_structured_blueprint_response
 
@@ -21,6 +31,288 @@ from blueprint_parser import parse_structured_blueprint_response
 #
 # All functionality preserved while improving maintainability and organization
 
+logger = logging.getLogger(__name__)
+
+# Generated blueprints and chat workflow logs are written here
+LOG_DIR = "logs"
+
+# Cap on queued log writes so a slow disk cannot grow memory without bound
+_LOG_WRITE_SEMAPHORE = asyncio.Semaphore(32)
+
+# Upper bound on in-flight provider calls so bursts queue here instead of hitting rate limits
+MAX_CONCURRENT_GENERATIONS = 8
+_GENERATION_SEMAPHORE = asyncio.Semaphore(MAX_CONCURRENT_GENERATIONS)
+
+
+# Exact-match cache of raw provider responses: key -> (stored_at, provider, raw_response)
+RESPONSE_CACHE_MAX_ENTRIES = 1024
+RESPONSE_CACHE_TTL_SECONDS = 1800
+_RESPONSE_CACHE: "OrderedDict[str, Tuple[float, AIProvider, str]]" = OrderedDict()
+
+
+def _response_cache_key(providers: List[AIProvider], system_instruction: str, user_prompt: str) -> str:
+    """Hash everything that determines a provider response"""
+    digest = hashlib.sha256()
+    for part in (*(p.__class__.__name__ for p in providers), system_instruction, user_prompt):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _get_cached_response(key: str) -> Optional[Tuple[AIProvider, str]]:
+    """Return a fresh cached (provider, raw_response), evicting it if expired"""
+    entry = _RESPONSE_CACHE.get(key)
+    if entry is None:
+        return None
+    stored_at, provider, raw_response = entry
+    if time.monotonic() - stored_at > RESPONSE_CACHE_TTL_SECONDS:
+        del _RESPONSE_CACHE[key]
+        return None
+    _RESPONSE_CACHE.move_to_end(key)
+    return provider, raw_response
+
+
+def _store_cached_response(key: str, provider: AIProvider, raw_response: str) -> None:
+    """Insert a response, dropping the least recently used entries past the cap"""
+    _RESPONSE_CACHE[key] = (time.monotonic(), provider, raw_response)
+    _RESPONSE_CACHE.move_to_end(key)
+    while len(_RESPONSE_CACHE) > RESPONSE_CACHE_MAX_ENTRIES:
+        _RESPONSE_CACHE.popitem(last=False)
+
+
+def ensure_log_dir() -> str:
+    """Create LOG_DIR if missing (it may be removed while the server runs) and return it"""
+    os.makedirs(LOG_DIR, exist_ok=True)
+    return LOG_DIR
+
+
+@functools.lru_cache(maxsize=1)
+def _log_pool() -> ThreadPoolExecutor:
+    """Dedicated pool for log writes so disk stalls never starve asyncio.to_thread work"""
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="codegen-log")
+
+
+def _write_generation_log(log_path: str, content: str) -> None:
+    """Write one generated-blueprint log file (blocking - call off the event loop)"""
+    ensure_log_dir()
+    with open(log_path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def _finish_generation_log_write(log_path: str, log_write: "asyncio.Future[None]") -> None:
+    """Release the log-write slot and report the outcome - a failed debug log never fails a request"""
+    _LOG_WRITE_SEMAPHORE.release()
+    if log_write.cancelled():
+        return
+    error = log_write.exception()
+    if error is not None:
+        logger.warning("⚠️ Could not save generated blueprint log %s: %s", log_path, error)
+    else:
+        logger.info("✅ Generated blueprint saved to: %s", log_path)
+
+
+# Provider failures worth retrying: rate limits, transient server-side errors
+# (529 is Anthropic's "overloaded") and dropped or timed-out connections
+_TRANSIENT_STATUS_CODES = frozenset({429, 500, 502, 503, 504, 529})
+_TRANSIENT_ERROR_TYPES = (anthropic.APIConnectionError, httpx.TransportError, TimeoutError, ConnectionError)
+RETRY_BASE_DELAY_SECONDS = 0.2
+RETRY_MAX_DELAY_SECONDS = 2.0
+
+
+def _is_transient_error(error: Exception) -> bool:
+    """Whether a provider error is a rate limit, server hiccup or network blip"""
+    # anthropic errors carry status_code, google-genai errors carry code
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    return status in _TRANSIENT_STATUS_CODES or isinstance(error, _TRANSIENT_ERROR_TYPES)
+
+
+class _CircuitBreaker:
+    """Fail fast after repeated transient failures until a cool-down has passed"""
+    
+    def __init__(self, fail_max: int = 10, reset_timeout: float = 30.0):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+    
+    def check(self, name: str) -> None:
+        if self.opened_at is None:
+            return
+        if not self.probing and time.monotonic() - self.opened_at >= self.reset_timeout:
+            # Half-open: exactly one probe call goes through, everyone else keeps failing fast
+            self.probing = True
+            return
+        raise RuntimeError(f"{name} is temporarily unavailable after repeated failures")
+    
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+    
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.probing or self.failures >= self.fail_max:
+            self.opened_at = time.monotonic()
+        self.probing = False
+    
+    def release_probe(self) -> None:
+        """Give up a probe that ended without an answer, letting the next caller probe"""
+        self.probing = False
+
+
+_CIRCUIT_BREAKERS: Dict[str, _CircuitBreaker] = {}
+
+
+async def _generate_with_retry(
+    provider: AIProvider,
+    system_instruction: str,
+    user_prompt: str,
+    max_retries: int
+) -> str:
+    """
+    Call a provider, retrying transient failures with jittered exponential backoff.
+    Each attempt holds one provider-friendly concurrency slot; backoff sleeps do not.
+    """
+    name = provider.__class__.__name__
+    breaker = _CIRCUIT_BREAKERS.setdefault(name, _CircuitBreaker())
+    for attempt in range(max_retries + 1):
+        breaker.check(name)
+        try:
+            async with _GENERATION_SEMAPHORE:
+                raw_response = await provider.generate_content_async(system_instruction, user_prompt)
+        except Exception as e:
+            if not _is_transient_error(e):
+                # The provider answered - only transient failures count against it
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            if attempt == max_retries:
+                raise
+            delay = random.uniform(0, min(RETRY_MAX_DELAY_SECONDS, RETRY_BASE_DELAY_SECONDS * 2 ** attempt))
+            logger.warning("⚠️ %s transient failure (attempt %d/%d): %s - retrying in %.2fs", name, attempt + 1, max_retries + 1, e, delay)
+            await asyncio.sleep(delay)
+        except BaseException:
+            breaker.release_probe()
+            raise
+        else:
+            breaker.record_success()
+            return raw_response
+    raise AssertionError("unreachable")
+
+
+@functools.lru_cache(maxsize=1)
+def _speculative_provider_types() -> Tuple[str, ...]:
+    """Provider types to race per request, e.g. SPECULATIVE_PROVIDERS=claude,gemini (off by default)"""
+    provider_types: List[str] = []
+    for provider_type in os.getenv("SPECULATIVE_PROVIDERS", "").split(","):
+        provider_type = provider_type.strip().lower()
+        if not provider_type or provider_type in provider_types:
+            continue
+        if provider_type not in PROVIDER_TYPES:
+            logger.warning("⚠️ Ignoring unknown SPECULATIVE_PROVIDERS entry '%s' (expected one of: %s)",
+                           provider_type, ", ".join(PROVIDER_TYPES))
+            continue
+        provider_types.append(provider_type)
+    
+    if len(provider_types) == 1:
+        logger.warning("⚠️ SPECULATIVE_PROVIDERS needs at least two providers to race - using the default provider")
+        return ()
+    return tuple(provider_types)
+
+
+def _is_usable_blueprint(raw_response: str) -> bool:
+    """Whether a raw response parses into a non-empty blueprint track list"""
+    try:
+        blueprint = json.loads(raw_response)
+    except ValueError:
+        return False
+    return isinstance(blueprint, list) and len(blueprint) > 0
+
+
+async def _race_providers(
+    providers: List[AIProvider],
+    system_instruction: str,
+    user_prompt: str,
+    max_retries: int
+) -> Tuple[AIProvider, str]:
+    """
+    Fire every provider concurrently and return the first usable blueprint response.
+    The losers are cancelled. If none is usable, the last completed response is
+    returned so the normal parse fallback applies; if all fail, the last error is raised.
+    """
+    tasks = {
+        asyncio.create_task(_generate_with_retry(provider, system_instruction, user_prompt, max_retries)): provider
+        for provider in providers
+    }
+    pending = set(tasks)
+    fallback: Optional[Tuple[AIProvider, str]] = None
+    last_error: Optional[BaseException] = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    last_error = task.exception()
+                    logger.warning("⚠️ %s failed during speculative generation: %s", tasks[task].__class__.__name__, last_error)
+                    continue
+                if _is_usable_blueprint(task.result()):
+                    return tasks[task], task.result()
+                fallback = (tasks[task], task.result())
+    finally:
+        for task in pending:
+            task.cancel()
+    
+    if fallback is not None:
+        return fallback
+    raise last_error
+
+
+async def _generate_response(
+    providers: List[AIProvider],
+    system_instruction: str,
+    user_prompt: str,
+    max_retries: int
+) -> Tuple[AIProvider, str]:
+    """Generate without blocking the event loop, racing when several providers are configured"""
+    if len(providers) > 1:
+        return await _race_providers(providers, system_instruction, user_prompt, max_retries)
+    provider = providers[0]
+    return provider, await _generate_with_retry(provider, system_instruction, user_prompt, max_retries)
+
+
+# Cache-miss generations in flight: cache key -> task producing (provider, raw_response)
+_INFLIGHT_GENERATIONS: Dict[str, "asyncio.Task[Tuple[AIProvider, str]]"] = {}
+
+
+def _finish_inflight_generation(cache_key: str, task: "asyncio.Task[Tuple[AIProvider, str]]") -> None:
+    """Drop a finished generation from the in-flight map"""
+    if _INFLIGHT_GENERATIONS.get(cache_key) is task:
+        del _INFLIGHT_GENERATIONS[cache_key]
+    if not task.cancelled():
+        task.exception()  # Mark retrieved - every waiter may have gone away
+
+
+async def _generate_single_flight(
+    cache_key: str,
+    providers: List[AIProvider],
+    system_instruction: str,
+    user_prompt: str,
+    max_retries: int
+) -> Tuple[AIProvider, str]:
+    """
+    Run at most one generation per cache key. The first caller starts it as a
+    detached task; identical requests arriving meanwhile await the same result (or error).
+    """
+    task = _INFLIGHT_GENERATIONS.get(cache_key)
+    if task is None:
+        task = asyncio.ensure_future(_generate_response(providers, system_instruction, user_prompt, max_retries))
+        _INFLIGHT_GENERATIONS[cache_key] = task
+        task.add_done_callback(functools.partial(_finish_inflight_generation, cache_key))
+    else:
+        logger.info("♻️ Joining in-flight generation for an identical request")
+    # Shield so a disconnecting caller - leader included - never cancels the shared call
+    return await asyncio.shield(task)
 
 
 async def generate_composition_with_validation(
@@ -30,17 +322,26 @@ async def generate_composition_with_validation(
     """
     Generate a CompositionBlueprint JSON using modular AI providers.
     """
+    # Pull the fields used below out of the request once
+    user_request = request.get('user_request', '')
+    current_composition = request.get('current_composition') or []
+    media_library = request.get('media_library') or []
+    
     try:
-        print(f"Blueprint generation attempt (no validation)")
+        logger.debug("Blueprint generation attempt (no validation)")
         
         # Build the blueprint prompt using modular function
         system_instruction, user_prompt = build_blueprint_prompt(request)
 
-        # Create appropriate AI provider (completely self-contained)
+        # Create appropriate AI provider(s) (completely self-contained)
+        speculative_types = _speculative_provider_types()
         try:
-            provider = create_ai_provider()
+            if len(speculative_types) > 1:
+                providers = [create_ai_provider(provider_type) for provider_type in speculative_types]
+            else:
+                providers = [create_ai_provider()]
         except Exception as e:
-            print(f"❌ Error in blueprint generation: {str(e)}")
+            logger.error("❌ Error in blueprint generation: %s", e)
             return {
                 "composition_code": "[]",
                 "content_data": [],
@@ -50,47 +351,64 @@ async def generate_composition_with_validation(
                 "error_message": str(e)
             }
         
-        # Generate using the provider (sync call within async function)
-        raw_response = provider.generate_content(system_instruction, user_prompt)
-        
-        print(f"✅ Generated {len(raw_response)} characters from {provider.__class__.__name__}")
+        # Identical prompts to the same provider(s) reuse the earlier response
+        cache_key = _response_cache_key(providers, system_instruction, user_prompt)
+        cached = _get_cached_response(cache_key)
+        if cached is not None:
+            provider, raw_response = cached
+            logger.info("♻️ Reusing cached %s response (%d characters)", provider.__class__.__name__, len(raw_response))
+        else:
+            # Concurrent identical requests share a single provider call
+            provider, raw_response = await _generate_single_flight(
+                cache_key, providers, system_instruction, user_prompt, max_retries
+            )
+            
+            logger.info("✅ Generated %d characters from %s", len(raw_response), provider.__class__.__name__)
         
         # Parse the structured JSON response
         duration, blueprint_json = parse_structured_blueprint_response(raw_response)
         
-        # Log the successful generated blueprint
-        timestamp = time.strftime("%Y%m%d_%H%M%S")
-        log_filename = f"generated_blueprint_{timestamp}.json"
-        log_path = os.path.join("logs", log_filename)
-        
-        # Create logs directory if it doesn't exist
-        os.makedirs("logs", exist_ok=True)
-        
-        # Save the generated blueprint with request context
-        with open(log_path, "w", encoding="utf-8") as f:
-            f.write(f"// Generated at: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"// User Request: {request.get('user_request', '')}\n")
-            f.write(f"// AI Provider: {provider.__class__.__name__}\n")
-            f.write(f"// Calculated Duration: {duration} seconds\n")
-            f.write(f"// Current Composition Tracks: {len(request.get('current_composition', []))}\n")
-            f.write(f"// Media Library Items: {len(request.get('media_library', []))}\n")
-            f.write(f"// CompositionBlueprint JSON\n")
-            f.write(f"// ======================================\n\n")
-            f.write(blueprint_json)
+        # Only cache real blueprints - failures and non-track JSON should hit the provider again
+        if cached is None and _is_usable_blueprint(raw_response):
+            _store_cached_response(cache_key, provider, raw_response)
         
-        print(f"✅ Generated blueprint saved to: {log_path}")
+        # Log the successful generated blueprint (debugging aid, DEBUG_LOG_GENERATED_CODE=true, off by default)
+        if env_flag('DEBUG_LOG_GENERATED_CODE'):
+            now = time.localtime()
+            timestamp = time.strftime("%Y%m%d_%H%M%S", now)
+            log_filename = f"generated_blueprint_{timestamp}.json"
+            log_path = os.path.join(LOG_DIR, log_filename)
+            
+            # Save the generated blueprint with request context
+            log_header = (
+                f"// Generated at: {time.strftime('%Y-%m-%d %H:%M:%S', now)}\n"
+                f"// User Request: {user_request}\n"
+                f"// AI Provider: {provider.__class__.__name__}\n"
+                f"// Calculated Duration: {duration} seconds\n"
+                f"// Current Composition Tracks: {len(current_composition)}\n"
+                f"// Media Library Items: {len(media_library)}\n"
+                f"// CompositionBlueprint JSON\n"
+                f"// ======================================\n\n"
+            )
+            # Hand the write to the log pool without awaiting it, so the response never waits on disk.
+            # Only when 32 writes are already queued does a request wait for a slot (backpressure).
+            await _LOG_WRITE_SEMAPHORE.acquire()
+            log_write = asyncio.get_running_loop().run_in_executor(
+                _log_pool(), _write_generation_log, log_path, log_header + blueprint_json
+            )
+            log_write.add_done_callback(functools.partial(_finish_generation_log_write, log_path))
         
         # Return in format expected by main.py
         return {
             "composition_code": blueprint_json,  # Frontend expects this field name
             "content_data": [],
-            "explanation": f"Generated CompositionBlueprint for: {request.get('user_request', '')}",
+            "explanation": f"Generated CompositionBlueprint for: {user_request}",
             "duration": duration,
             "success": True
         }
         
     except Exception as e:
-        print(f"❌ Error in blueprint generation: {e}")
+        logger.error("❌ Error in blueprint generation: %s", e)
         return {
             "composition_code": "[]",  # Empty blueprint fallback
             "content_data": [],
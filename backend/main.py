@@ -1,7 +1,11 @@
 import os
+import sys
 import subprocess
 import tempfile
 import json
+import logging
+import queue
+import atexit
 import time
 import re
 import shutil
@@ -11,6 +15,7 @@ import asyncio
 import httpx
 from PIL import Image
 from io import BytesIO
+from logging.handlers import QueueHandler, QueueListener
 
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException, UploadFile, File
@@ -22,7 +27,7 @@ from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 
 # Import code generation functionality
-from code_generator import generate_composition_with_validation
+from code_generator import generate_composition_with_validation, ensure_log_dir
 import code_generator  # Keep for other functions like parse_ai_response
 
 from schema import (
@@ -31,10 +36,28 @@ from schema import (
     CheckGenerationStatusRequest, CheckGenerationStatusResponse,
     FetchStockVideoRequest, FetchStockVideoResponse, StockVideoResult
 )
-from providers import ContentGenerationProvider
+from providers import ContentGenerationProvider, get_gemini_client
 
 load_dotenv()
 
+# Route module loggers (code_generator, blueprint_parser) to stdout like the prints around them.
+# Handlers only enqueue; a background listener thread does the actual stdout writes.
+_log_queue = queue.SimpleQueue()
+_log_stream_handler = logging.StreamHandler(sys.stdout)
+_log_stream_handler.setFormatter(logging.Formatter("%(message)s"))
+_log_listener = QueueListener(_log_queue, _log_stream_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+# Third-party loggers (httpx, google-genai, ...) stay at WARNING; LOG_LEVEL only applies to our modules
+logging.basicConfig(level=logging.WARNING, handlers=[QueueHandler(_log_queue)])
+logger = logging.getLogger(__name__)
+_LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+if _LOG_LEVEL not in logging.getLevelNamesMapping():
+    logger.warning("⚠️ Unknown LOG_LEVEL '%s', using INFO", _LOG_LEVEL)
+    _LOG_LEVEL = "INFO"
+for _module in (__name__, "code_generator", "blueprint_parser", "providers"):
+    logging.getLogger(_module).setLevel(_LOG_LEVEL)
+
 # Get API key (used for both regular and Vertex AI fallback)
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
 
@@ -45,13 +68,13 @@ USE_VERTEX_AI = os.getenv("USE_VERTEX_AI", "false").lower() == "true"
 if USE_VERTEX_AI:
     # For Vertex AI fine-tuned models, we'll initialize in code_generator.py
     # Keep a dummy client here for compatibility
-    gemini_api = genai.Client(api_key=GEMINI_API_KEY)  # Fallback client
+    gemini_api = get_gemini_client(GEMINI_API_KEY)  # Fallback client
     # Cloud Storage will be imported when needed
     storage_bucket_name = f"{os.getenv('VERTEX_PROJECT_ID', '24816576653')}-screenwrite-uploads"
     print(f"🔥 Using Vertex AI Fine-tuned Model - Project: {os.getenv('VERTEX_PROJECT_ID', '24816576653')}, Location: {os.getenv('VERTEX_LOCATION', 'europe-west1')}")
 else:
     # Use regular Gemini API
-    gemini_api = genai.Client(api_key=GEMINI_API_KEY)
+    gemini_api = get_gemini_client(GEMINI_API_KEY)
     storage_bucket_name = None
     print("🔥 Using regular Gemini API")
 
@@ -580,11 +603,11 @@ async def upload_to_gemini(file: UploadFile = File(...)) -> GeminiUploadResponse
 async def generate_composition(request: CompositionRequest) -> CompositionResponse:
     """Generate a new Remotion composition blueprint using AI."""
     
-    print(f"🎬 Main: Processing request: '{request.user_request}'")
-    print(f"📝 Main: Current composition has {len(request.current_composition or [])} tracks")
+    logger.info("🎬 Main: Processing request: '%s'", request.user_request)
+    logger.debug("📝 Main: Current composition has %d tracks", len(request.current_composition or []))
     
     # AI Blueprint Generation (NEW SYSTEM)
-    print(f"🚀 AI: Generating CompositionBlueprint with updated system")
+    logger.debug("🚀 AI: Generating CompositionBlueprint with updated system")
     
     # Convert to dict format expected by code generator
     request_dict = {
@@ -598,7 +621,7 @@ async def generate_composition(request: CompositionRequest) -> CompositionRespon
     # Call the blueprint generation module (LLM-agnostic)
     result = await generate_composition_with_validation(request_dict)
     
-    print(f"✅ Main: Blueprint generation completed - Success: {result['success']}")
+    logger.info("✅ Main: Blueprint generation completed - Success: %s", result['success'])
     
     # Convert result back to the response model
     return CompositionResponse(
@@ -654,8 +677,8 @@ Fix the error and return the corrected code."""
             thinking_budget=2000  # Default thinking budget for fixes
         )
 
-        # Use the same AI call pattern as other endpoints
-        response = gemini_api.models.generate_content(
+        # Use the async client so the event loop keeps serving other requests during the call
+        response = await gemini_api.aio.models.generate_content(
             model="gemini-2.5-flash",
             config=types.GenerateContentConfig(
                 system_instruction=system_instruction,
@@ -700,7 +723,7 @@ async def analyze_video(request: VideoAnalysisRequest) -> VideoAnalysisResponse:
         if USE_VERTEX_AI:
             # For Vertex AI, the gemini_file_id is actually a Cloud Storage URI
             # Use a simpler approach - pass the file URI directly in contents
-            response = gemini_api.models.generate_content(
+            response = await gemini_api.aio.models.generate_content(
                 model="gemini-2.5-flash",
                 contents=[request.gemini_file_id, request.question],
                 config=types.GenerateContentConfig(temperature=0.1)
@@ -709,13 +732,13 @@ async def analyze_video(request: VideoAnalysisRequest) -> VideoAnalysisResponse:
             # For regular Gemini API, use the file reference directly
             # The gemini_file_id is the file URI from Files API (e.g., "files/abc123")
             # We need to get the file object from the file ID
-            file_obj = gemini_api.files.get(name=request.gemini_file_id)
+            file_obj = await gemini_api.aio.files.get(name=request.gemini_file_id)
             
             # Check if file is ready for analysis
             if hasattr(file_obj, 'state') and file_obj.state != 'ACTIVE':
                 raise Exception(f"Video file is not ready for analysis yet (state: {file_obj.state}). Please wait a moment and try again.")
             
-            response = gemini_api.models.generate_content(
+            response = await gemini_api.aio.models.generate_content(
                 model="gemini-2.5-flash", 
                 contents=[file_obj, request.question],
                 config=types.GenerateContentConfig(temperature=0.1)
@@ -756,7 +779,7 @@ async def analyze_video(request: VideoAnalysisRequest) -> VideoAnalysisResponse:
 
 
 # Initialize content generation provider
-content_generator = ContentGenerationProvider()
+content_generator = ContentGenerationProvider(gemini_api)
 
 # Store active generation operations
 active_operations = {}
@@ -1129,10 +1152,9 @@ class ChatLogRequest(BaseModel):
 async def save_chat_log(request: ChatLogRequest):
     """Save chat workflow log entries to files"""
     try:
-        logs_dir = "logs"
-        os.makedirs(logs_dir, exist_ok=True)
-        
-        log_file = os.path.join(logs_dir, f"chat_workflow_{request.session_id}.json")
+        # Shared with the generation logs; the directory is created once, on first use
+        log_file = os.path.join(ensure_log_dir(), f"chat_workflow_{request.session_id}.json")
+        now = time.strftime("%Y-%m-%d %H:%M:%S")
         
         # Read existing log or create new one
         if os.path.exists(log_file):
@@ -1141,18 +1163,19 @@ async def save_chat_log(request: ChatLogRequest):
         else:
             log_data = {
                 "session_id": request.session_id,
-                "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "created": now,
                 "entries": []
             }
         
         # Append new entry
         log_data["entries"].append(request.log_entry)
-        log_data["last_updated"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        log_data["last_updated"] = now
         log_data["total_entries"] = len(log_data["entries"])
         
-        # Save updated log
+        # Save updated log - serialize first so the file gets one write instead of one per JSON chunk
+        payload = json.dumps(log_data, indent=2)
         with open(log_file, 'w') as f:
-            json.dump(log_data, f, indent=2)
+            f.write(payload)
         
         return {"success": True, "log_file": log_file, "entry_count": len(log_data["entries"])}
         
@@ -1,5 +1,7 @@
 # System instructions and prompt templates for blueprint generation
 
+from typing import Any
+
 # ============================================================================
 # PART 1: BLUEPRINT DOCUMENTATION (Technical Reference)
 # ============================================================================
@@ -791,20 +793,32 @@ Technical Requirements:
 """
 
 # ============================================================================
-# HELPER FUNCTIONS FOR BUILDING PROMPTS
+# COMBINED SYSTEM INSTRUCTION
 # ============================================================================
 
-
-def build_system_instruction() -> str:
-    """Build the complete system instruction for blueprint generation"""
-    
-    response_format = """
+RESPONSE_FORMAT_INSTRUCTIONS = """
 
 RESPONSE FORMAT - You must respond with valid CompositionBlueprint JSON:
 [valid CompositionBlueprint JSON array - structured output will enforce proper format]"""
 
-    # Combine all four structured sections
-    return BLUEPRINT_DOCUMENTATION + "\n\n" + CSS_TECHNIQUES_DOCUMENTATION + "\n\n" + REACT_STRUCTURE_VALIDATION + "\n\n" + LLM_ROLE_INSTRUCTIONS + response_format
+# Combine all four structured sections once at import - the result never changes
+SYSTEM_INSTRUCTION = BLUEPRINT_DOCUMENTATION + "\n\n" + CSS_TECHNIQUES_DOCUMENTATION + "\n\n" + REACT_STRUCTURE_VALIDATION + "\n\n" + LLM_ROLE_INSTRUCTIONS + RESPONSE_FORMAT_INSTRUCTIONS
+
+
+MEDIA_URL_WARNING = (
+    "\n⚠️ CRITICAL: Use the EXACT URLs provided above in Video/Img/Audio src props. Never use filenames like 'video.mp4' - always use the full URL.\n"
+    "⚠️ EXAMPLE: src: 'https://example.com/file.mp4' NOT src: 'filename.mp4'\n"
+)
+
+
+# ============================================================================
+# HELPER FUNCTIONS FOR BUILDING PROMPTS
+# ============================================================================
+
+
+def build_system_instruction() -> str:
+    """Build the complete system instruction for blueprint generation"""
+    return SYSTEM_INSTRUCTION
 
 
 def build_media_section(media_library: list) -> str:
@@ -812,45 +826,43 @@ def build_media_section(media_library: list) -> str:
     if not media_library or len(media_library) == 0:
         return "\nNo media assets available. Create compositions using text, shapes, and animations only.\n"
     
-    media_section = "\nAVAILABLE MEDIA ASSETS:\n"
+    parts = ["\nAVAILABLE MEDIA ASSETS:\n"]
     for media in media_library:
         name = media.get('name', 'unnamed')
         media_type = media.get('mediaType', 'unknown')
         duration = media.get('durationInSeconds', 0)
         media_width = media.get('media_width', 0)
         media_height = media.get('media_height', 0)
-        media_url_local = media.get('mediaUrlLocal', '')
-        media_url_remote = media.get('mediaUrlRemote', '')
+        # Prefer remote static URL, fallback to local blob URL
+        actual_url = media.get('mediaUrlRemote', '') or media.get('mediaUrlLocal', '')
         
-        # Determine which URL to use (prefer remote static URL, fallback to local blob URL)
-        actual_url = media_url_remote if media_url_remote else media_url_local
-        
-        # Build comprehensive media description with metadata
-        if media_type == 'video':
-            media_info = f"- {name}: Video"
-            if media_width and media_height:
-                media_info += f" ({media_width}x{media_height})"
-            if duration:
-                media_info += f" ({duration}s)"
-            media_info += f" - URL: {actual_url}\n"
-            media_section += media_info
-        elif media_type == 'image':
-            media_info = f"- {name}: Image"
-            if media_width and media_height:
-                media_info += f" ({media_width}x{media_height})"
-            media_info += f" - URL: {actual_url}\n"
-            media_section += media_info
-        elif media_type == 'audio':
-            media_info = f"- {name}: Audio"
-            if duration:
-                media_info += f" ({duration}s)"
-            media_info += f" - URL: {actual_url}\n"
-            media_section += media_info
-    
-    media_section += "\n⚠️ CRITICAL: Use the EXACT URLs provided above in Video/Img/Audio src props. Never use filenames like 'video.mp4' - always use the full URL.\n"
-    media_section += "⚠️ EXAMPLE: src: 'https://example.com/file.mp4' NOT src: 'filename.mp4'\n"
+        # Unknown (or non-string) media types are left out of the prompt
+        line_format = _MEDIA_LINE_FORMATS.get(media_type) if isinstance(media_type, str) else None
+        if line_format is None:
+            continue
+        label, with_dimensions, with_duration = line_format
+        dimensions = _media_dimensions(media_width, media_height) if with_dimensions else ""
+        length = _media_duration(duration) if with_duration else ""
+        parts.append(f"- {name}: {label}{dimensions}{length} - URL: {actual_url}\n")
     
-    return media_section
+    parts.append(MEDIA_URL_WARNING)
+    return "".join(parts)
+
+
+def _media_dimensions(width: Any, height: Any) -> str:
+    return f" ({width}x{height})" if width and height else ""
+
+
+def _media_duration(duration: Any) -> str:
+    return f" ({duration}s)" if duration else ""
+
+
+# media_type -> (label, include dimensions, include duration) for one asset line
+_MEDIA_LINE_FORMATS = {
+    'video': ("Video", True, True),
+    'image': ("Image", True, False),
+    'audio': ("Audio", False, True),
+}
 
 
 def build_composition_context(current_composition: list) -> str:
@@ -874,10 +886,7 @@ def build_composition_context(current_composition: list) -> str:
 
 def build_blueprint_prompt(request: dict) -> tuple[str, str]:
     """Build system instruction and user prompt for blueprint generation"""
-    # Build system instruction
-    system_instruction = build_system_instruction()
-    
-    # Build user prompt components
+    # Build user prompt components - the system instruction is a static module constant
     media_section = build_media_section(request.get('media_library', []))
     composition_context = build_composition_context(request.get('current_composition', []))
     
@@ -886,4 +895,4 @@ def build_blueprint_prompt(request: dict) -> tuple[str, str]:
 {composition_context}
 {media_section}"""
 
-    return system_instruction, user_prompt
+    return SYSTEM_INSTRUCTION, user_prompt
@@ -1,13 +1,108 @@
 import os
+import asyncio
+import functools
+import logging
 import time
 import uuid
 import base64
 import io
-from typing import Any
+from typing import Any, Optional
 from google import genai
 from google.genai import types
 import anthropic
 
+logger = logging.getLogger(__name__)
+
+
+# Fine-tuned Vertex AI deployment
+VERTEX_PROJECT_ID = "24816576653"
+VERTEX_LOCATION = "europe-west1"
+VERTEX_ENDPOINT_NAME = f"projects/{VERTEX_PROJECT_ID}/locations/{VERTEX_LOCATION}/endpoints/6998941266608128000"
+
+# CompositionBlueprint schema using Gemini's Schema format directly
+BLUEPRINT_RESPONSE_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "clips": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "id": {"type": "string"},
+                        "startTimeInSeconds": {"type": "number"},
+                        "endTimeInSeconds": {"type": "number"},
+                        "element": {"type": "string"},
+                        "transitionFromPrevious": {
+                            "type": "object",
+                            "properties": {
+                                "type": {"type": "string"},
+                                "durationInSeconds": {"type": "number"},
+                                "direction": {"type": "string"}
+                            },
+                            "required": ["type", "durationInSeconds"]
+                        },
+                        "transitionToNext": {
+                            "type": "object",
+                            "properties": {
+                                "type": {"type": "string"},
+                                "durationInSeconds": {"type": "number"},
+                                "direction": {"type": "string"}
+                            },
+                            "required": ["type", "durationInSeconds"]
+                        }
+                    },
+                    "required": ["id", "startTimeInSeconds", "endTimeInSeconds", "element"]
+                }
+            }
+        },
+        "required": ["clips"]
+    }
+}
+
+
+@functools.lru_cache(maxsize=4)
+def _blueprint_generation_config(system_instruction: str) -> types.GenerateContentConfig:
+    """Build the structured-output config once per system instruction"""
+    return types.GenerateContentConfig(
+        system_instruction=system_instruction,
+        temperature=0.1,
+        response_mime_type="application/json",
+        response_schema=BLUEPRINT_RESPONSE_SCHEMA
+    )
+
+
+@functools.lru_cache(maxsize=4)
+def _vertex_generation_config(system_instruction: str) -> types.GenerateContentConfig:
+    """Build the fine-tuned endpoint config once per system instruction"""
+    return types.GenerateContentConfig(
+        system_instruction=system_instruction,
+        temperature=0.0
+    )
+
+
+_TRUE_VALUES = frozenset({'true', '1', 'yes'})
+
+
+# Resolved lazily rather than at import - main.py calls load_dotenv() after importing us
+@functools.lru_cache(maxsize=None)
+def env_flag(name: str) -> bool:
+    """Read a boolean environment flag once per process"""
+    return os.getenv(name, '').lower() in _TRUE_VALUES
+
+
+@functools.lru_cache(maxsize=None)
+def get_gemini_client(api_key: Optional[str]) -> genai.Client:
+    """One google-genai client per API key for the whole process, so callers share its connection pool"""
+    return genai.Client(api_key=api_key)
+
+
+async def _join_stream_text(stream: Any) -> str:
+    """Collect the text of a google-genai response stream into one stripped string"""
+    chunks = [chunk.text async for chunk in stream if chunk.text]
+    return "".join(chunks).strip()
+
 
 class AIProvider:
     """Abstract interface for AI content generation"""
@@ -15,6 +110,11 @@ class AIProvider:
     def generate_content(self, system_instruction: str, user_prompt: str) -> str:
         """Generate content using the AI provider"""
         raise NotImplementedError
+    
+    async def generate_content_async(self, system_instruction: str, user_prompt: str) -> str:
+        """Generate content without blocking the event loop"""
+        # Providers without a native async client run the sync call on a worker thread
+        return await asyncio.to_thread(self.generate_content, system_instruction, user_prompt)
 
 
 class GeminiProvider(AIProvider):
@@ -22,94 +122,60 @@ class GeminiProvider(AIProvider):
     
     def __init__(self, api_client: Any = None):
         if api_client is None:
-            # Create our own client if none provided
-            import os
-            from google import genai
+            # Share the process-wide client if none provided
             api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
             if not api_key:
                 raise ValueError("GEMINI_API_KEY or GOOGLE_API_KEY environment variable is required")
-            self.api_client = genai.Client(api_key=api_key)
+            self.api_client = get_gemini_client(api_key)
         else:
             self.api_client = api_client
     
     def generate_content(self, system_instruction: str, user_prompt: str) -> str:
-        # Define the schema using Gemini's Schema format directly
-        schema = {
-            "type": "array",
-            "items": {
-                "type": "object",
-                "properties": {
-                    "clips": {
-                        "type": "array",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "id": {"type": "string"},
-                                "startTimeInSeconds": {"type": "number"},
-                                "endTimeInSeconds": {"type": "number"},
-                                "element": {"type": "string"},
-                                "transitionFromPrevious": {
-                                    "type": "object",
-                                    "properties": {
-                                        "type": {"type": "string"},
-                                        "durationInSeconds": {"type": "number"},
-                                        "direction": {"type": "string"}
-                                    },
-                                    "required": ["type", "durationInSeconds"]
-                                },
-                                "transitionToNext": {
-                                    "type": "object",
-                                    "properties": {
-                                        "type": {"type": "string"},
-                                        "durationInSeconds": {"type": "number"},
-                                        "direction": {"type": "string"}
-                                    },
-                                    "required": ["type", "durationInSeconds"]
-                                }
-                            },
-                            "required": ["id", "startTimeInSeconds", "endTimeInSeconds", "element"]
-                        }
-                    }
-                },
-                "required": ["clips"]
-            }
-        }
-        
         response = self.api_client.models.generate_content(
             model="gemini-2.5-flash",
             contents=user_prompt,
-            config={
-                "system_instruction": system_instruction,
-                "temperature": 0.1,
-                "response_mime_type": "application/json",
-                "response_schema": schema
-            }
+            config=_blueprint_generation_config(system_instruction)
         )
         return response.text.strip()
+    
+    async def generate_content_async(self, system_instruction: str, user_prompt: str) -> str:
+        # Stream so chunks are collected as they are generated rather than in one large body
+        stream = await self.api_client.aio.models.generate_content_stream(
+            model="gemini-2.5-flash",
+            contents=user_prompt,
+            config=_blueprint_generation_config(system_instruction)
+        )
+        return await _join_stream_text(stream)
 
 
 class VertexAIProvider(AIProvider):
     """Google Vertex AI fine-tuned model provider"""
     
     def __init__(self):
-        # Set environment variables for Vertex AI
-        os.environ['GOOGLE_CLOUD_PROJECT'] = "24816576653"
-        os.environ['GOOGLE_CLOUD_LOCATION'] = "europe-west1"
-        os.environ['GOOGLE_GENAI_USE_VERTEXAI'] = "True"
-        
-        self.client = genai.Client()
-        self.endpoint_name = "projects/24816576653/locations/europe-west1/endpoints/6998941266608128000"
+        # Configure the client explicitly rather than through process-wide env vars,
+        # which would also flip any genai.Client() created later onto Vertex AI
+        self.client = genai.Client(
+            vertexai=True,
+            project=VERTEX_PROJECT_ID,
+            location=VERTEX_LOCATION
+        )
+        self.endpoint_name = VERTEX_ENDPOINT_NAME
     
     def generate_content(self, system_instruction: str, user_prompt: str) -> str:
         response = self.client.models.generate_content(
             model=self.endpoint_name,
             contents=user_prompt,
-            config={
-                "system_instruction": system_instruction,
-                "temperature": 0.0,
-            }
+            config=_vertex_generation_config(system_instruction)
         )
         return response.text.strip()
+    
+    async def generate_content_async(self, system_instruction: str, user_prompt: str) -> str:
+        stream = await self.client.aio.models.generate_content_stream(
+            model=self.endpoint_name,
+            contents=user_prompt,
+            config=_vertex_generation_config(system_instruction)
+        )
+        return await _join_stream_text(stream)
 
 
 class ClaudeProvider(AIProvider):
@@ -120,29 +186,59 @@ class ClaudeProvider(AIProvider):
         if not claude_api_key:
             raise Exception("ANTHROPIC_API_KEY environment variable is required when USE_CLAUDE is enabled")
         
-        self.client = anthropic.Anthropic(api_key=claude_api_key)
+        # SDK retries off: code_generator's backoff and circuit breaker are the only retry layer
+        self.client = anthropic.Anthropic(api_key=claude_api_key, max_retries=0)
+        self.async_client = anthropic.AsyncAnthropic(api_key=claude_api_key, max_retries=0)
     
-    def generate_content(self, system_instruction: str, user_prompt: str) -> str:
-        response = self.client.messages.create(
-            max_tokens=8192,
-            model="claude-sonnet-4-20250514",
-            temperature=0.3,
-            system=system_instruction,
-            messages=[
+    def _message_params(self, system_instruction: str, user_prompt: str) -> dict:
+        """Request parameters shared by the sync and async streaming calls"""
+        return {
+            "max_tokens": 8192,
+            "model": "claude-sonnet-4-20250514",
+            "temperature": 0.3,
+            # The system instruction is static - mark it cacheable so repeat requests reuse the prefix
+            "system": [
+                {
+                    "type": "text",
+                    "text": system_instruction,
+                    "cache_control": {"type": "ephemeral"}
+                }
+            ],
+            "messages": [
                 {
                     "role": "user",
                     "content": user_prompt
                 }
             ]
+        }
+    
+    def generate_content(self, system_instruction: str, user_prompt: str) -> str:
+        # Stream so text is assembled as it arrives instead of waiting on one large body
+        with self.client.messages.stream(**self._message_params(system_instruction, user_prompt)) as stream:
+            text = "".join(stream.text_stream).strip()
+            self._log_cache_usage(stream.get_final_message().usage)
+        return text
+    
+    async def generate_content_async(self, system_instruction: str, user_prompt: str) -> str:
+        async with self.async_client.messages.stream(**self._message_params(system_instruction, user_prompt)) as stream:
+            chunks = [text async for text in stream.text_stream]
+            self._log_cache_usage((await stream.get_final_message()).usage)
+        return "".join(chunks).strip()
+    
+    @staticmethod
+    def _log_cache_usage(usage: Any) -> None:
+        """Report how much of the prompt was served from Anthropic's prompt cache"""
+        logger.debug(
+            "Claude prompt cache: %s tokens read, %s written, %s uncached input",
+            getattr(usage, "cache_read_input_tokens", None),
+            getattr(usage, "cache_creation_input_tokens", None),
+            usage.input_tokens
         )
-        return response.content[0].text.strip()
 
 
 def get_ai_provider(gemini_api: Any = None, use_vertex_ai: bool = False) -> AIProvider:
     """Factory function to get the appropriate AI provider based on configuration"""
-    use_claude = os.getenv('USE_CLAUDE', '').lower() in ['true', '1', 'yes']
-    
-    if use_claude:
+    if env_flag('USE_CLAUDE'):
         return ClaudeProvider()
     elif use_vertex_ai:
         return VertexAIProvider()
@@ -154,34 +250,41 @@ def get_ai_provider(gemini_api: Any = None, use_vertex_ai: bool = False) -> AIPr
 
 def create_ai_provider(provider_type: str = None) -> AIProvider:
     """Create AI provider based on environment configuration or specified type"""
-    use_claude = os.getenv('USE_CLAUDE', '').lower() in ['true', '1', 'yes']
-    use_vertex_ai = os.getenv('USE_VERTEX_AI', '').lower() in ['true', '1', 'yes']
-    gemini_api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-    
-    # Override with specific type if provided
-    if provider_type == 'claude':
-        return ClaudeProvider()
-    elif provider_type == 'vertex':
-        return VertexAIProvider()
-    elif provider_type == 'gemini':
-        if not gemini_api_key:
-            raise ValueError("GEMINI_API_KEY not found in environment")
-        from google import genai
-        gemini_api = genai.Client(api_key=gemini_api_key)
-        return GeminiProvider(gemini_api)
+    # Auto-detect based on environment unless a known type is requested
+    if provider_type not in _PROVIDER_FACTORIES:
+        if env_flag('USE_CLAUDE'):
+            provider_type = 'claude'
+        elif env_flag('USE_VERTEX_AI'):
+            provider_type = 'vertex'
+        else:
+            provider_type = 'gemini'
     
-    # Auto-detect based on environment
-    if use_claude:
-        return ClaudeProvider()
-    elif use_vertex_ai:
-        return VertexAIProvider()
-    else:
-        # Default to Gemini if API key is available
-        if not gemini_api_key:
-            raise ValueError("No AI provider configured - missing API keys")
-        from google import genai
-        gemini_api = genai.Client(api_key=gemini_api_key)
-        return GeminiProvider(gemini_api)
+    return _get_cached_provider(provider_type)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_cached_provider(provider_type: str) -> AIProvider:
+    """Construct each provider (and its SDK client) once per process so connection pools stay warm"""
+    return _PROVIDER_FACTORIES[provider_type]()
+
+
+def _create_gemini_provider() -> GeminiProvider:
+    """Create the default Gemini provider from the API key in the environment"""
+    gemini_api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
+    if not gemini_api_key:
+        raise ValueError("No AI provider configured - missing API keys")
+    return GeminiProvider(get_gemini_client(gemini_api_key))
+
+
+# Provider type -> factory; add new backends here rather than growing an if/elif chain
+_PROVIDER_FACTORIES = {
+    'claude': ClaudeProvider,
+    'vertex': VertexAIProvider,
+    'gemini': _create_gemini_provider,
+}
+
+# Provider type names accepted by create_ai_provider (read-only view for callers)
+PROVIDER_TYPES = tuple(_PROVIDER_FACTORIES)
 
 
 class ContentGenerationProvider:
@@ -189,13 +292,11 @@ class ContentGenerationProvider:
     
     def __init__(self, api_client: Any = None):
         if api_client is None:
-            # Create our own client if none provided
-            import os
-            from google import genai
+            # Share the process-wide client if none provided
             api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
             if not api_key:
                 raise ValueError("GEMINI_API_KEY or GOOGLE_API_KEY environment variable is required")
-            self.api_client = genai.Client(api_key=api_key)
+            self.api_client = get_gemini_client(api_key)
         else:
             self.api_client = api_client
     